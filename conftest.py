@@ -0,0 +1,13 @@
+"""
+Shared pytest fixtures for the PQC Secure Transfer test suite
+"""
+
+import os
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def key() -> bytes:
+    """256-bit encryption key shared by every test in the session"""
+    return os.urandom(32)
@@ -47,8 +47,9 @@ class HybridCrypto:
             Tuple of (public_key_bundle, private_key_bundle)
         """
         # Generate classical X25519 keypair
-        self.classical_private_key = x25519.X25519PrivateKey.generate()
-        self.classical_public_key = self.classical_private_key.public_key()
+        classical_private_key = x25519.X25519PrivateKey.generate()
+        self.classical_private_key = classical_private_key
+        self.classical_public_key = classical_private_key.public_key()
         
         # Generate post-quantum keypair
         with oqs.KeyEncapsulation(self.pqc_algorithm) as kem:
@@ -73,8 +74,14 @@ class HybridCrypto:
             'algorithm': self.pqc_algorithm
         }
         
+        classical_private_bytes = classical_private_key.private_bytes(
+            encoding=serialization.Encoding.Raw,
+            format=serialization.PrivateFormat.Raw,
+            encryption_algorithm=serialization.NoEncryption()
+        )
+        
         private_key_bundle = {
-            'classical': self.classical_private_key,
+            'classical': classical_private_bytes,
             'pqc': pqc_secret_key,
             'algorithm': self.pqc_algorithm
         }
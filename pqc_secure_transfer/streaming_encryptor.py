@@ -6,11 +6,21 @@ Handles 15-20GB files efficiently with constant memory usage
 import os
 import struct
 from typing import Iterator, BinaryIO, Optional
-from Crypto.Cipher import AES
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from Crypto.Random import get_random_bytes
 import hashlib
 
 
+def _advise_sequential(file: BinaryIO):
+    """Hint the kernel that a file will be read front to back"""
+    if hasattr(os, 'posix_fadvise'):
+        try:
+            os.posix_fadvise(file.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        except OSError:
+            pass  # Pipes and FIFOs reject the hint; it is only an optimization
+
+
 class StreamingEncryptor:
     """
     Streaming AEAD encryption for large files using AES-256-GCM
@@ -32,6 +42,9 @@ class StreamingEncryptor:
         self.chunk_size = chunk_size
         self.nonce_size = 12  # 96 bits for GCM
         self.tag_size = 16    # 128 bits for GCM authentication tag
+        
+        # Key schedule is set up once and reused for every chunk nonce
+        self._aead = AESGCM(key)
     
     def encrypt_stream(self, input_stream: BinaryIO, output_stream: BinaryIO, 
                       associated_data: Optional[bytes] = None) -> bytes:
@@ -56,8 +69,8 @@ class StreamingEncryptor:
             input_stream.seek(0, 2)  # Seek to end
             file_size = input_stream.tell()
             input_stream.seek(current_pos)  # Restore position
-        except (OSError, IOError):
-            file_size = 0  # Unknown size for non-seekable streams
+        except (OSError, IOError, AttributeError):
+            file_size = 0  # Unknown size for non-seekable or read()-only streams
         
         header = master_nonce + struct.pack('<Q', file_size)
         output_stream.write(header)
@@ -65,21 +78,29 @@ class StreamingEncryptor:
         chunk_index = 0
         file_hasher = hashlib.sha256()
         
+        # Read every chunk into the same buffer instead of allocating per chunk;
+        # streams that only implement read() fall back to a fresh bytes object
+        readinto = getattr(input_stream, 'readinto', None)
+        buffer = bytearray(self.chunk_size)
+        buffer_view = memoryview(buffer)
+        
         while True:
-            chunk = input_stream.read(self.chunk_size)
+            if readinto is not None:
+                chunk = buffer_view[:readinto(buffer) or 0]
+            else:
+                chunk = memoryview(input_stream.read(self.chunk_size))
             if not chunk:
                 break
             
             # Generate unique nonce for this chunk
             chunk_nonce = self._generate_chunk_nonce(master_nonce, chunk_index)
             
-            # Encrypt chunk
-            cipher = AES.new(self.key, AES.MODE_GCM, nonce=chunk_nonce)
-            
-            if associated_data:
-                cipher.update(associated_data)
-            
-            ciphertext, tag = cipher.encrypt_and_digest(chunk)
+            # Encrypt chunk (output is ciphertext followed by the tag)
+            sealed = memoryview(
+                self._aead.encrypt(chunk_nonce, chunk, associated_data or None)
+            )
+            ciphertext = sealed[:-self.tag_size]
+            tag = sealed[-self.tag_size:]
             
             # Write chunk: size + nonce + tag + ciphertext
             chunk_header = struct.pack('<I', len(ciphertext)) + chunk_nonce + tag
@@ -117,6 +138,10 @@ class StreamingEncryptor:
         chunk_index = 0
         file_hasher = hashlib.sha256()
         
+        # Reused buffer holding one chunk's ciphertext followed by its tag
+        readinto = getattr(input_stream, 'readinto', None)
+        buffer = bytearray(self.chunk_size + self.tag_size)
+        
         while True:
             # Read chunk header
             chunk_header = input_stream.read(4 + self.nonce_size + self.tag_size)
@@ -130,10 +155,25 @@ class StreamingEncryptor:
             chunk_nonce = chunk_header[4:4 + self.nonce_size]
             tag = chunk_header[4 + self.nonce_size:]
             
-            # Read ciphertext
-            ciphertext = input_stream.read(chunk_size)
-            if len(ciphertext) != chunk_size:
-                raise ValueError("Incomplete chunk data")
+            # Read ciphertext and append the tag, as the AEAD expects them together
+            if readinto is not None and chunk_size <= self.chunk_size:
+                sealed = memoryview(buffer)[:chunk_size + self.tag_size]
+                if readinto(sealed[:chunk_size]) != chunk_size:
+                    raise ValueError("Incomplete chunk data")
+                sealed[chunk_size:] = tag
+            else:
+                # The length field is not authenticated yet, so never size a buffer
+                # from it; bounded reads only allocate for data actually present
+                pieces = []
+                remaining = chunk_size
+                while remaining:
+                    piece = input_stream.read(min(remaining, self.chunk_size))
+                    if not piece:
+                        raise ValueError("Incomplete chunk data")
+                    pieces.append(piece)
+                    remaining -= len(piece)
+                pieces.append(tag)
+                sealed = memoryview(b''.join(pieces))
             
             # Verify nonce matches expected pattern
             expected_nonce = self._generate_chunk_nonce(master_nonce, chunk_index)
@@ -141,15 +181,14 @@ class StreamingEncryptor:
                 raise ValueError(f"Nonce mismatch at chunk {chunk_index}")
             
             # Decrypt chunk
-            cipher = AES.new(self.key, AES.MODE_GCM, nonce=chunk_nonce)
-            
-            if associated_data:
-                cipher.update(associated_data)
-            
             try:
-                plaintext = cipher.decrypt_and_verify(ciphertext, tag)
-            except ValueError as e:
-                raise ValueError(f"Authentication failed at chunk {chunk_index}: {e}")
+                plaintext = self._aead.decrypt(
+                    chunk_nonce, sealed, associated_data or None
+                )
+            except InvalidTag:
+                raise ValueError(
+                    f"Authentication failed at chunk {chunk_index}: MAC check failed"
+                )
             
             output_stream.write(plaintext)
             file_hasher.update(plaintext)
@@ -173,6 +212,7 @@ class StreamingEncryptor:
         """
         with open(input_path, 'rb') as input_file, \
              open(output_path, 'wb') as output_file:
+            _advise_sequential(input_file)
             return self.encrypt_stream(input_file, output_file, associated_data)
     
     def decrypt_file(self, input_path: str, output_path: str,
@@ -190,6 +230,7 @@ class StreamingEncryptor:
         """
         with open(input_path, 'rb') as input_file, \
              open(output_path, 'wb') as output_file:
+            _advise_sequential(input_file)
             return self.decrypt_stream(input_file, output_file, associated_data)
     
     def _generate_chunk_nonce(self, master_nonce: bytes, chunk_index: int) -> bytes:
@@ -4,257 +4,270 @@ Comprehensive test of the PQC Secure Transfer System
 Tests all components without requiring liboqs installation
 """
 
+import io
 import os
+import struct
 import sys
-import tempfile
+import types
 import hashlib
-from unittest.mock import Mock, patch
-
-# Add current directory to path
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-
-
-def test_streaming_encryption():
-    """Test streaming encryption without PQC dependencies"""
-    print("Testing Streaming Encryption...")
-    
-    try:
-        from pqc_secure_transfer.streaming_encryptor import StreamingEncryptor
-        
-        # Create test data
-        test_data = b"Hello, World! " * 1000000  # ~13MB of test data
-        key = os.urandom(32)  # 256-bit key
-        
-        # Create temporary files
-        with tempfile.NamedTemporaryFile() as input_file, \
-             tempfile.NamedTemporaryFile() as encrypted_file, \
-             tempfile.NamedTemporaryFile() as decrypted_file:
-            
-            # Write test data
-            input_file.write(test_data)
-            input_file.flush()
-            input_file.seek(0)
-            
-            # Encrypt
-            encryptor = StreamingEncryptor(key)
-            original_hash = encryptor.encrypt_stream(input_file, encrypted_file)
-            
-            # Decrypt
-            encrypted_file.seek(0)
-            decrypted_hash = encryptor.decrypt_stream(encrypted_file, decrypted_file)
-            
-            # Verify
-            decrypted_file.seek(0)
-            decrypted_data = decrypted_file.read()
-            
-            assert decrypted_data == test_data, "Decrypted data doesn't match original"
-            assert original_hash == decrypted_hash, "Hash verification failed"
-            
-            print("✅ Streaming encryption test passed")
-            return True
-            
-    except Exception as e:
-        print(f"❌ Streaming encryption test failed: {e}")
-        return False
 
+import pytest
+
+from pqc_secure_transfer.key_manager import KeyManager
+from pqc_secure_transfer.streaming_encryptor import StreamingEncryptor
+
+# Small chunks keep the streaming tests cheap while exercising chunk boundaries
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+@pytest.mark.parametrize("size, writer_chunk_size", [
+    (0, STREAM_CHUNK_SIZE),
+    (1, STREAM_CHUNK_SIZE),
+    (STREAM_CHUNK_SIZE - 1, STREAM_CHUNK_SIZE),
+    (STREAM_CHUNK_SIZE, STREAM_CHUNK_SIZE),
+    (STREAM_CHUNK_SIZE + 1, STREAM_CHUNK_SIZE),
+    (3 * STREAM_CHUNK_SIZE + 13, STREAM_CHUNK_SIZE),
+    # Chunks larger than the decryptor's own chunk_size
+    (3 * STREAM_CHUNK_SIZE + 13, 2 * STREAM_CHUNK_SIZE),
+])
+def test_streaming_encryption(key, size, writer_chunk_size):
+    """Test streaming encryption round trips across chunk boundaries"""
+    # Random bytes so no accidental pattern can mask a bug
+    test_data = os.urandom(size)
+    expected_hash = hashlib.sha256(test_data).digest()
+    
+    # In-memory streams keep the test free of disk I/O
+    input_stream = io.BytesIO(test_data)
+    encrypted_stream = io.BytesIO()
+    decrypted_stream = io.BytesIO()
+    
+    # Encrypt
+    encryptor = StreamingEncryptor(key, chunk_size=writer_chunk_size)
+    original_hash = encryptor.encrypt_stream(input_stream, encrypted_stream)
+    
+    # Decrypt
+    decryptor = StreamingEncryptor(key, chunk_size=STREAM_CHUNK_SIZE)
+    encrypted_stream.seek(0)
+    decrypted_hash = decryptor.decrypt_stream(encrypted_stream, decrypted_stream)
+    
+    # Verify
+    expected_size = StreamingEncryptor.estimate_encrypted_size(size, writer_chunk_size)
+    assert len(encrypted_stream.getvalue()) == expected_size, "Encrypted size mismatch"
+    # Hash the buffer in place instead of copying it out for a bytes compare
+    assert hashlib.sha256(decrypted_stream.getbuffer()).digest() == expected_hash, \
+        "Decrypted data doesn't match original"
+    assert original_hash == expected_hash, "Encryption hash mismatch"
+    assert decrypted_hash == expected_hash, "Decryption hash mismatch"
 
-def test_key_manager():
+
+class _ReadOnlyStream:
+    """File-like wrapper exposing read() and nothing else"""
+    
+    def __init__(self, data):
+        self._stream = io.BytesIO(data)
+    
+    def read(self, size=-1):
+        return self._stream.read(size)
+
+
+def test_read_only_streams(key):
+    """Test that streams without readinto, tell or seek still round trip"""
+    test_data = os.urandom(3 * STREAM_CHUNK_SIZE + 13)
+    expected_hash = hashlib.sha256(test_data).digest()
+    encryptor = StreamingEncryptor(key, chunk_size=STREAM_CHUNK_SIZE)
+    
+    encrypted_stream = io.BytesIO()
+    original_hash = encryptor.encrypt_stream(_ReadOnlyStream(test_data), encrypted_stream)
+    
+    decrypted_stream = io.BytesIO()
+    decrypted_hash = encryptor.decrypt_stream(
+        _ReadOnlyStream(encrypted_stream.getvalue()), decrypted_stream
+    )
+    
+    assert hashlib.sha256(decrypted_stream.getbuffer()).digest() == expected_hash, \
+        "Decrypted data doesn't match original"
+    assert original_hash == expected_hash, "Encryption hash mismatch"
+    assert decrypted_hash == expected_hash, "Decryption hash mismatch"
+
+
+def test_crafted_chunk_length_rejected(key):
+    """Test that a forged 4GB chunk length fails without a matching allocation"""
+    # File header (nonce + size), then a chunk header claiming 0xFFFFFFFF bytes
+    header = os.urandom(12) + struct.pack('<Q', 0)
+    chunk_header = struct.pack('<I', 0xFFFFFFFF) + os.urandom(12 + 16)
+    encryptor = StreamingEncryptor(key, chunk_size=STREAM_CHUNK_SIZE)
+    
+    with pytest.raises(ValueError, match="Incomplete chunk data"):
+        encryptor.decrypt_stream(io.BytesIO(header + chunk_header), io.BytesIO())
+
+
+def test_tampered_chunk_rejected(key):
+    """Test that a single flipped ciphertext byte fails authentication"""
+    encryptor = StreamingEncryptor(key, chunk_size=STREAM_CHUNK_SIZE)
+    encrypted_stream = io.BytesIO()
+    encryptor.encrypt_stream(io.BytesIO(os.urandom(1000)), encrypted_stream)
+    
+    # The stream ends with the only chunk's ciphertext
+    tampered = bytearray(encrypted_stream.getvalue())
+    tampered[-1] ^= 0x01
+    
+    with pytest.raises(ValueError, match="Authentication failed at chunk 0"):
+        encryptor.decrypt_stream(io.BytesIO(bytes(tampered)), io.BytesIO())
+
+
+def test_associated_data_mismatch_rejected(key):
+    """Test that decrypting with associated data the sender never used fails"""
+    encryptor = StreamingEncryptor(key, chunk_size=STREAM_CHUNK_SIZE)
+    encrypted_stream = io.BytesIO()
+    encryptor.encrypt_stream(io.BytesIO(os.urandom(1000)), encrypted_stream)
+    
+    encrypted_stream.seek(0)
+    with pytest.raises(ValueError, match="Authentication failed"):
+        encryptor.decrypt_stream(encrypted_stream, io.BytesIO(), associated_data=b"x")
+
+
+def test_key_manager(tmp_path):
     """Test key management system"""
-    print("Testing Key Manager...")
-    
-    try:
-        from pqc_secure_transfer.key_manager import KeyManager
-        
-        # Create temporary key store
-        with tempfile.TemporaryDirectory() as temp_dir:
-            key_manager = KeyManager(temp_dir, master_password="test123")
-            
-            # Test key storage
-            test_public = b"test_public_key_data"
-            test_private = b"test_private_key_data"
-            
-            success = key_manager.store_keypair(
-                key_id="test_key",
-                public_key=test_public,
-                private_key=test_private,
-                algorithm="TestAlgorithm",
-                metadata={"test": True}
-            )
-            
-            assert success, "Failed to store keypair"
-            
-            # Test key loading
-            loaded = key_manager.load_keypair("test_key")
-            assert loaded is not None, "Failed to load keypair"
-            
-            loaded_public, loaded_private, algorithm = loaded
-            assert loaded_public == test_public, "Public key mismatch"
-            assert loaded_private == test_private, "Private key mismatch"
-            assert algorithm == "TestAlgorithm", "Algorithm mismatch"
-            
-            # Test key listing
-            keys = key_manager.list_keys()
-            assert len(keys) == 1, "Key list length mismatch"
-            assert keys[0]["key_id"] == "test_key", "Key ID mismatch"
-            
-            print("✅ Key manager test passed")
-            return True
-            
-    except Exception as e:
-        print(f"❌ Key manager test failed: {e}")
+    # Create temporary key store
+    key_manager = KeyManager(str(tmp_path), master_password="test123")
+    
+    # Test key storage
+    test_public = b"test_public_key_data"
+    test_private = b"test_private_key_data"
+    
+    success = key_manager.store_keypair(
+        key_id="test_key",
+        public_key=test_public,
+        private_key=test_private,
+        algorithm="TestAlgorithm",
+        metadata={"test": True}
+    )
+    
+    assert success, "Failed to store keypair"
+    
+    # Test key loading
+    loaded = key_manager.load_keypair("test_key")
+    assert loaded is not None, "Failed to load keypair"
+    
+    loaded_public, loaded_private, algorithm = loaded
+    assert loaded_public == test_public, "Public key mismatch"
+    assert loaded_private == test_private, "Private key mismatch"
+    assert algorithm == "TestAlgorithm", "Algorithm mismatch"
+    
+    # Test key listing
+    keys = key_manager.list_keys()
+    assert len(keys) == 1, "Key list length mismatch"
+    assert keys[0]["key_id"] == "test_key", "Key ID mismatch"
+
+
+class _FakeKEM:
+    """Minimal stand-in for oqs.KeyEncapsulation with fixed outputs"""
+    
+    def __init__(self, algorithm):
+        self.algorithm = algorithm
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
         return False
+    
+    def generate_keypair(self):
+        return b"mock_pqc_public_key"
+    
+    def export_secret_key(self):
+        return b"mock_pqc_secret_key"
+    
+    def encap_secret(self, public_key):
+        return b"mock_ciphertext", b"mock_shared_secret"
+    
+    def decap_secret(self, ciphertext):
+        return b"mock_shared_secret"
 
 
-def test_hybrid_crypto_mock():
+def test_hybrid_crypto_mock(monkeypatch):
     """Test hybrid crypto with mocked liboqs"""
-    print("Testing Hybrid Crypto (mocked)...")
-    
-    try:
-        # Mock the oqs module
-        mock_oqs = Mock()
-        mock_kem = Mock()
-        
-        # Configure mock KEM
-        mock_kem.generate_keypair.return_value = b"mock_pqc_public_key"
-        mock_kem.export_secret_key.return_value = b"mock_pqc_secret_key"
-        mock_kem.encap_secret.return_value = (b"mock_ciphertext", b"mock_shared_secret")
-        mock_kem.decap_secret.return_value = b"mock_shared_secret"
-        
-        mock_oqs.KeyEncapsulation.return_value.__enter__.return_value = mock_kem
-        mock_oqs.KeyEncapsulation.return_value.__exit__.return_value = None
-        
-        with patch.dict('sys.modules', {'oqs': mock_oqs}):
-            from pqc_secure_transfer.hybrid_crypto import HybridCrypto
-            
-            # Test keypair generation
-            crypto = HybridCrypto("Kyber768")
-            public_key, private_key = crypto.generate_keypair()
-            
-            assert public_key is not None, "Public key generation failed"
-            assert private_key is not None, "Private key generation failed"
-            
-            print("✅ Hybrid crypto test passed (mocked)")
-            return True
-            
-    except Exception as e:
-        print(f"❌ Hybrid crypto test failed: {e}")
-        return False
+    from pqc_secure_transfer import hybrid_crypto
+    
+    fake_oqs = types.SimpleNamespace(KeyEncapsulation=_FakeKEM)
+    
+    # hybrid_crypto is imported with the package, so patch its module globals
+    # rather than sys.modules
+    monkeypatch.setattr(hybrid_crypto, 'oqs', fake_oqs, raising=False)
+    monkeypatch.setattr(hybrid_crypto, 'OQS_AVAILABLE', True)
+    
+    # Test keypair generation
+    crypto = hybrid_crypto.HybridCrypto("Kyber768")
+    public_key, private_key = crypto.generate_keypair()
+    
+    assert public_key is not None, "Public key generation failed"
+    assert private_key is not None, "Private key generation failed"
+    
+    public_bundle = crypto._deserialize_keys(public_key)
+    assert public_bundle['pqc'] == b"mock_pqc_public_key", "PQC public key mismatch"
+
 
+def _file_sha256(path) -> bytes:
+    """SHA-256 of a file, streamed in C on Python 3.11+"""
+    with open(path, 'rb') as f:
+        if hasattr(hashlib, 'file_digest'):
+            return hashlib.file_digest(f, 'sha256').digest()
+        return hashlib.sha256(f.read()).digest()
 
-def test_file_operations():
+
+def test_file_operations(key, tmp_path):
     """Test file operations and utilities"""
-    print("Testing File Operations...")
-    
-    try:
-        from pqc_secure_transfer.streaming_encryptor import StreamingEncryptor
-        
-        # Test file encryption/decryption
-        test_content = b"Test file content for encryption" * 10000
-        key = os.urandom(32)
-        
-        with tempfile.NamedTemporaryFile(delete=False) as temp_input, \
-             tempfile.NamedTemporaryFile(delete=False) as temp_encrypted, \
-             tempfile.NamedTemporaryFile(delete=False) as temp_decrypted:
-            
-            # Write test content
-            temp_input.write(test_content)
-            temp_input.flush()
-            
-            # Get file paths
-            input_path = temp_input.name
-            encrypted_path = temp_encrypted.name
-            decrypted_path = temp_decrypted.name
-        
-        try:
-            # Encrypt file
-            encryptor = StreamingEncryptor(key)
-            original_hash = encryptor.encrypt_file(input_path, encrypted_path)
-            
-            # Decrypt file
-            decrypted_hash = encryptor.decrypt_file(encrypted_path, decrypted_path)
-            
-            # Verify content
-            with open(decrypted_path, 'rb') as f:
-                decrypted_content = f.read()
-            
-            assert decrypted_content == test_content, "File content mismatch"
-            assert original_hash == decrypted_hash, "Hash mismatch"
-            
-            print("✅ File operations test passed")
-            return True
-            
-        finally:
-            # Cleanup
-            for path in [input_path, encrypted_path, decrypted_path]:
-                try:
-                    os.unlink(path)
-                except:
-                    pass
-                    
-    except Exception as e:
-        print(f"❌ File operations test failed: {e}")
-        return False
+    # Test file encryption/decryption
+    test_content = b"Test file content for encryption" * 10000
+    expected_hash = hashlib.sha256(test_content).digest()
+    
+    # Write test content in one call; encrypt_file reopens it for reading
+    input_path = tmp_path / "input.bin"
+    input_path.write_bytes(test_content)
+    encrypted_path = tmp_path / "input.bin.enc"
+    decrypted_path = tmp_path / "input.bin.dec"
+    
+    # Encrypt file
+    encryptor = StreamingEncryptor(key)
+    original_hash = encryptor.encrypt_file(str(input_path), str(encrypted_path))
+    
+    # Decrypt file
+    decrypted_hash = encryptor.decrypt_file(str(encrypted_path), str(decrypted_path))
+    
+    # Verify content by digest rather than loading the whole file
+    assert _file_sha256(decrypted_path) == expected_hash, "File content mismatch"
+    assert original_hash == expected_hash, "Encryption hash mismatch"
+    assert decrypted_hash == expected_hash, "Decryption hash mismatch"
 
 
 def test_performance_estimation():
     """Test performance estimation functions"""
-    print("Testing Performance Estimation...")
-    
-    try:
-        from pqc_secure_transfer.streaming_encryptor import StreamingEncryptor
-        
-        # Test size estimation
-        original_size = 20 * 1024 * 1024 * 1024  # 20GB
-        estimated_size = StreamingEncryptor.estimate_encrypted_size(original_size)
-        
-        # Should be slightly larger than original
-        assert estimated_size > original_size, "Estimated size should be larger"
-        
-        # Overhead should be reasonable (less than 1% for large files)
-        overhead = estimated_size - original_size
-        overhead_percent = (overhead / original_size) * 100
-        
-        assert overhead_percent < 1.0, f"Overhead too high: {overhead_percent:.2f}%"
-        
-        print(f"✅ Performance estimation test passed (overhead: {overhead_percent:.3f}%)")
-        return True
-        
-    except Exception as e:
-        print(f"❌ Performance estimation test failed: {e}")
-        return False
+    # Test size estimation
+    original_size = 20 * 1024 * 1024 * 1024  # 20GB
+    estimated_size = StreamingEncryptor.estimate_encrypted_size(original_size)
+    
+    # Should be slightly larger than original
+    assert estimated_size > original_size, "Estimated size should be larger"
+    
+    # Overhead should be reasonable (less than 1% for large files)
+    overhead = estimated_size - original_size
+    overhead_percent = (overhead / original_size) * 100
+    
+    assert overhead_percent < 1.0, f"Overhead too high: {overhead_percent:.2f}%"
 
 
-def test_error_handling():
+def test_error_handling(key):
     """Test error handling and edge cases"""
-    print("Testing Error Handling...")
-    
-    try:
-        from pqc_secure_transfer.streaming_encryptor import StreamingEncryptor
-        
-        # Test invalid key size
-        try:
-            StreamingEncryptor(b"short_key")  # Too short
-            assert False, "Should have raised ValueError for short key"
-        except ValueError:
-            pass  # Expected
-        
-        # Test with valid key
-        key = os.urandom(32)
-        encryptor = StreamingEncryptor(key)
-        
-        # Test with non-existent file
-        try:
-            encryptor.encrypt_file("non_existent_file.txt", "output.enc")
-            assert False, "Should have raised exception for non-existent file"
-        except (FileNotFoundError, IOError):
-            pass  # Expected
-        
-        print("✅ Error handling test passed")
-        return True
-        
-    except Exception as e:
-        print(f"❌ Error handling test failed: {e}")
-        return False
+    # Test invalid key size
+    with pytest.raises(ValueError):
+        StreamingEncryptor(b"short_key")  # Too short
+    
+    # Test with valid key
+    encryptor = StreamingEncryptor(key)
+    
+    # Test with non-existent file
+    with pytest.raises((FileNotFoundError, IOError)):
+        encryptor.encrypt_file("non_existent_file.txt", "output.enc")
 
 
 def main():
@@ -262,33 +275,11 @@ def main():
     print("PQC Secure Transfer System - Comprehensive Test")
     print("=" * 60)
     
-    tests = [
-        test_streaming_encryption,
-        test_key_manager,
-        test_hybrid_crypto_mock,
-        test_file_operations,
-        test_performance_estimation,
-        test_error_handling
-    ]
-    
-    passed = 0
-    failed = 0
-    
-    for test in tests:
-        try:
-            if test():
-                passed += 1
-            else:
-                failed += 1
-        except Exception as e:
-            print(f"❌ Test {test.__name__} crashed: {e}")
-            failed += 1
-        print()
+    # Extra arguments go straight to pytest, e.g. "-n auto" to opt in to xdist
+    exit_code = pytest.main(["-q", __file__] + sys.argv[1:])
     
     print("=" * 60)
-    print(f"Test Results: {passed} passed, {failed} failed")
-    
-    if failed == 0:
+    if exit_code == 0:
         print("🎉 All tests passed! System is working correctly.")
         print("\nNext steps:")
         print("1. Install liboqs-python for full PQC functionality:")
@@ -301,9 +292,8 @@ def main():
         print("   python examples/client.py --create-test 100")
     else:
         print("❌ Some tests failed. Please check the error messages above.")
-        return 1
     
-    return 0
+    return int(exit_code)
 
 
 if __name__ == "__main__":